@@ -1,67 +1,668 @@
-from mcp.server.fastmcp import FastMCP
 import os
-import PyPDF2
 from typing import Dict, List, Optional, Any
 import logging
 import tempfile
-import uuid
+import itertools
+import secrets
 import json
-from pathlib import Path
+import contextlib
+import collections
+import hashlib
+import shutil
+import multiprocessing
+import threading
+import time
+
+from pdf_worker import decrypt, extract_one, init_worker, open_document, page_text
+
+try:
+    import pymupdf
+except ImportError:
+    pymupdf = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
 logger = logging.getLogger(__name__)
 
-logger.info("Starting PDF Reader MCP server...")
-
 instructions ="""The PDF Reader allows you to read PDFs on the local filesystem.
 It supports password-protected and unprotected PDFs.
 
 Ensure that you always use an absolute path for file_path when calling read_pdf.
 """
 
-mcp = FastMCP("PDF Reader", instructions=instructions,dependencies=["PyPDF2>=3.0.0"])
+# Spawned worker processes re-run the main script before they start, importing
+# this module again. They only need pdf_worker, so skip the MCP SDK, which takes
+# about half a second to import, along with the logging setup and the server
+if multiprocessing.current_process().name == "MainProcess":
+    from mcp.server.fastmcp import FastMCP
+
+    # Configure logging, unless the process embedding this module already has, so
+    # reloading the module never stacks up extra handlers
+    if not logging.getLogger().handlers:
+        logging.basicConfig(
+            level=logging.INFO,
+            format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        )
+
+    logger.info("Starting PDF Reader MCP server...")
+
+    mcp = FastMCP("PDF Reader", instructions=instructions,dependencies=["PyPDF2>=3.0.0", "orjson>=3.9.0"])
+else:
+    mcp = None
+
+# Text extraction backends, PyMuPDF is C-backed and much faster than PyPDF2 but
+# an optional extra, so it's only the default when installed
+BACKENDS = ("pymupdf", "pypdf2")
+DEFAULT_BACKEND = "pymupdf" if pymupdf is not None else "pypdf2"
+
+# PyMuPDF reports metadata with its own lowercase keys, map them back to the
+# PDF Info dictionary names that PyPDF2 returns
+PYMUPDF_METADATA_KEYS = {
+    "title": "Title",
+    "author": "Author",
+    "subject": "Subject",
+    "keywords": "Keywords",
+    "creator": "Creator",
+    "producer": "Producer",
+    "creationDate": "CreationDate",
+    "modDate": "ModDate",
+    "trapped": "Trapped",
+}
+
+# Documents with fewer pages than this are extracted by a single worker
+# process, more workers cost more to start than they save on short documents
+PARALLEL_MIN_PAGES = 16
+
+# Seconds a single page may take to extract in a worker process before it is
+# skipped, malformed PDFs can send the parsers into very long or endless loops.
+# Timing starts once the workers have started. None disables the limit
+PAGE_TIMEOUT = 120
+
+# Worker processes are spawned rather than forked, a forked child inherits the
+# stdin lock held by the MCP stdio reader thread and deadlocks closing stdin
+# before it runs anything
+WORKER_CONTEXT = multiprocessing.get_context("spawn")
 
 # Create a temporary directory for storing extracted page content
 TEMP_DIR = os.path.join(tempfile.gettempdir(), "pdf_reader_extracts")
 os.makedirs(TEMP_DIR, exist_ok=True)
-logger.info(f"Using temporary directory for PDF extracts: {TEMP_DIR}")
+logger.info("Using temporary directory for PDF extracts: %s", TEMP_DIR)
+
+# Each extraction is cached in its own subdirectory of TEMP_DIR, holding the
+# content file and the response that was returned for it
+CACHE_METADATA_FILE = "metadata.json"
+CACHE_MAX_ENTRIES = 64
+CLEANUP_INTERVAL_SECONDS = 3600
+
+# Number of recently opened documents kept open in memory, so follow up calls
+# on the same PDF skip reparsing its cross-reference table and decrypting it
+DOCUMENT_CACHE_SIZE = 8
+
+# Extracted pages are written to the content file in batches of about this many bytes
+WRITE_BATCH_SIZE = 1024 * 1024
 
 
-def cleanup_old_files(max_age_hours=24):
+def cleanup_old_files(max_age_hours=24, max_cache_entries=CACHE_MAX_ENTRIES):
     """
     Clean up old temporary files that might have been left behind
 
     Args:
         max_age_hours: Maximum age of files to keep in hours
+        max_cache_entries: Maximum number of cached extractions to keep, least recently used are removed first
     """
-    import time
-
     current_time = time.time()
     max_age_seconds = max_age_hours * 3600
 
     try:
-        for file_path in Path(TEMP_DIR).glob("*.txt"):
-            if current_time - file_path.stat().st_mtime > max_age_seconds:
-                logger.info(f"Cleaning up old file: {file_path}")
-                file_path.unlink(missing_ok=True)
+        # scandir reuses the file type from the directory listing, so only a
+        # single stat per entry is needed for its mtime
+        cache_entries = []
+        with os.scandir(TEMP_DIR) as entries:
+            for entry in entries:
+                # Another call or server may remove an entry while it's being
+                # looked at, that only skips the entry rather than the whole pass
+                try:
+                    mtime = entry.stat(follow_symlinks=False).st_mtime
+                    if entry.is_dir(follow_symlinks=False):
+                        cache_entries.append((mtime, entry.path))
+                    elif (
+                        entry.name.endswith((".txt", ".json"))
+                        and current_time - mtime > max_age_seconds
+                    ):
+                        logger.info("Cleaning up old file: %s", entry.path)
+                        os.unlink(entry.path)
+                except FileNotFoundError:
+                    continue
+
+        # Most recently used cache entries first
+        cache_entries.sort(reverse=True)
+        for index, (mtime, path) in enumerate(cache_entries):
+            if index >= max_cache_entries or current_time - mtime > max_age_seconds:
+                logger.info("Cleaning up cached extract: %s", path)
+                shutil.rmtree(path, ignore_errors=True)
     except Exception as e:
-        logger.error(f"Error cleaning up old files: {e}")
+        logger.error("Error cleaning up old files: %s", e)
+
 
+def _schedule_cleanup():
+    """
+    Clean up old files now and again every CLEANUP_INTERVAL_SECONDS, on a daemon timer thread
+    """
+    cleanup_old_files()
+    timer = threading.Timer(CLEANUP_INTERVAL_SECONDS, _schedule_cleanup)
+    timer.daemon = True
+    timer.start()
 
-# Clean up old files on startup
-cleanup_old_files()
 
 #
 # PDF Reader functionality
 #
 
 
-@mcp.tool()
+def _iter_pages(doc, backend, zero_indexed_pages):
+    """
+    Lazily extract pages in-process, one page at a time
+
+    Args:
+        doc: Open PyMuPDF document or PyPDF2 reader
+        backend: Backend that opened the document
+        zero_indexed_pages: Page numbers to extract (0-indexed)
+
+    Yields:
+        (page_number, text) tuples in page order, page_number is 1-indexed
+    """
+    for n in zero_indexed_pages:
+        yield n + 1, page_text(doc, backend, n)
+
+
+def _password_hash(password):
+    """
+    Hash a password for use in a cache key, so it is never stored in the clear
+
+    Args:
+        password: Optional password to decrypt the PDF
+    """
+    # No password stays None, so it never shares a key with an empty password
+    if password is None:
+        return None
+    return hashlib.sha256(password.encode("utf-8")).hexdigest()
+
+
+# Open documents by (path, mtime, size, backend, password), least recently used first
+_document_cache = collections.OrderedDict()
+_document_cache_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def _cached_document(file_path, stat, password, backend):
+    """
+    Open and decrypt a PDF, reusing a recently opened copy of the same unchanged file
+
+    Args:
+        file_path: Absolute path to the PDF file
+        stat: os.stat result for the PDF file, so edits to the file aren't served a stale copy
+        password: Optional password to decrypt the PDF
+        backend: Text extraction backend to use
+
+    Yields:
+        Tuple of (doc, is_encrypted, needs_password, decrypted)
+    """
+    # The password is part of the key as a decrypted document stays decrypted,
+    # a copy opened with one password must not be handed to a call with another
+    key = (
+        os.path.abspath(file_path),
+        stat.st_mtime_ns,
+        stat.st_size,
+        backend,
+        _password_hash(password),
+    )
+
+    # Take the document out of the cache while it's in use, so concurrent calls
+    # never share one
+    with _document_cache_lock:
+        entry = _document_cache.pop(key, None)
+
+    if entry is None:
+        stack = contextlib.ExitStack()
+        try:
+            doc, is_encrypted, needs_password = open_document(file_path, backend, stack)
+            decrypted = not needs_password or (
+                password is not None and decrypt(doc, backend, password)
+            )
+        except Exception:
+            stack.close()
+            raise
+        entry = (doc, is_encrypted, needs_password, decrypted, stack)
+
+    try:
+        yield entry[:4]
+    except BaseException:
+        # The document may have been left in a bad state, don't reuse it
+        entry[4].close()
+        raise
+
+    # Documents that couldn't be decrypted aren't worth keeping
+    if not entry[3]:
+        entry[4].close()
+        return
+
+    with _document_cache_lock:
+        evicted = []
+        # Another call may have returned a copy of the same document meanwhile
+        displaced = _document_cache.pop(key, None)
+        if displaced is not None:
+            evicted.append(displaced)
+        _document_cache[key] = entry
+        while len(_document_cache) > DOCUMENT_CACHE_SIZE:
+            evicted.append(_document_cache.popitem(last=False)[1])
+
+    # Close the MuPDF document or the PyPDF2 file mapping outside of the lock
+    for *_, stack in evicted:
+        stack.close()
+
+
+def _extract_pages(
+    doc,
+    file_path,
+    password,
+    backend,
+    use_workers,
+    zero_indexed_pages,
+    timed_out_pages,
+):
+    """
+    Extract the requested pages, in-process or in worker processes so a page
+    that hangs the parser can be killed, and in parallel for long documents
+
+    Args:
+        doc: Open PyMuPDF document or PyPDF2 reader, used for in-process extraction
+        file_path: Absolute path to the PDF file, reopened by each worker process
+        password: Optional password to decrypt the PDF
+        backend: Text extraction backend to use
+        use_workers: Extract in worker processes instead of in-process
+        zero_indexed_pages: Page numbers to extract (0-indexed)
+        timed_out_pages: List that pages which hit PAGE_TIMEOUT are appended to (1-indexed)
+
+    Yields:
+        (page_number, text) tuples in page order, page_number is 1-indexed
+    """
+    if not use_workers:
+        yield from _iter_pages(doc, backend, zero_indexed_pages)
+        return
+
+    processes = min(os.cpu_count() or 1, len(zero_indexed_pages))
+    if len(zero_indexed_pages) < PARALLEL_MIN_PAGES:
+        processes = 1
+
+    # Page extraction is CPU bound Python (PyPDF2) or holds the GIL between
+    # C calls (PyMuPDF), so threads don't help - use processes instead. Unlike
+    # a thread, a process stuck in C code can be killed and its memory reclaimed
+    remaining = zero_indexed_pages
+    while remaining:
+        ready = WORKER_CONTEXT.Semaphore(0)
+        # Leaving the block terminates the pool, taking any wedged worker with it
+        with WORKER_CONTEXT.Pool(
+            processes,
+            initializer=init_worker,
+            initargs=(file_path, password, backend, ready),
+        ) as pool:
+            # Only queue pages once every worker has started and opened the PDF,
+            # starting a worker takes long enough that it would otherwise count
+            # against the timeout of the first pages
+            for _ in range(processes):
+                if not ready.acquire(timeout=PAGE_TIMEOUT):
+                    raise TimeoutError(
+                        f"Worker processes took longer than {PAGE_TIMEOUT}s to open the PDF"
+                    )
+            results = [pool.apply_async(extract_one, (n,)) for n in remaining]
+            # Pages are collected in the order they were queued, so by the time
+            # a page is waited on it has already started in a worker
+            for index, result in enumerate(results):
+                try:
+                    n, text = result.get(PAGE_TIMEOUT)
+                except multiprocessing.TimeoutError:
+                    n = remaining[index]
+                    logger.warning(
+                        "Page %d of %s took longer than %ss to extract, skipping it",
+                        n + 1,
+                        file_path,
+                        PAGE_TIMEOUT,
+                    )
+                    timed_out_pages.append(n + 1)
+                    yield n + 1, ""
+                    # Restart the pool for the pages after the one that hung
+                    remaining = remaining[index + 1 :]
+                    break
+                # Hand each page on to be written out rather than holding the
+                # whole document in memory
+                yield n + 1, text
+            else:
+                remaining = []
+
+
+def _cache_dir(file_path, stat, password, pages, backend):
+    """
+    Get the cache directory for an extraction, keyed on everything that changes its output
+
+    Args:
+        file_path: Absolute path to the PDF file
+        stat: os.stat result for the PDF file, so edits to the file miss the cache
+        password: Optional password to decrypt the PDF
+        pages: Optional list of page numbers to extract (1-indexed)
+        backend: Text extraction backend to use
+    """
+    key = (
+        os.path.abspath(file_path),
+        stat.st_mtime_ns,
+        stat.st_size,
+        _password_hash(password),
+        # Looked up before the PDF is opened, so the pages can't be checked
+        # against the page count yet. Requests for the same pages still share
+        # an entry however they order or repeat them, and all pages is None
+        tuple(sorted({p for p in pages if p >= 1})) if pages else None,
+        backend,
+    )
+    return os.path.join(TEMP_DIR, hashlib.sha256(repr(key).encode("utf-8")).hexdigest()[:32])
+
+
+def _load_cached(cache_dir):
+    """
+    Load the response of a previous extraction, if it is still on disk
+
+    Args:
+        cache_dir: Cache directory of the extraction
+    """
+    try:
+        with open(os.path.join(cache_dir, CACHE_METADATA_FILE), "rb") as f:
+            data = f.read()
+        result = orjson.loads(data) if orjson is not None else json.loads(data)
+    except (OSError, ValueError):
+        return None
+
+    if not os.path.exists(result["content_file"]):
+        return None
+
+    # Mark the entry as recently used for cleanup_old_files
+    os.utime(cache_dir)
+    return result
+
+
+def _store_cached(cache_dir, result):
+    """
+    Save the response of an extraction so later calls can reuse it
+
+    Args:
+        cache_dir: Cache directory of the extraction
+        result: Response returned for the extraction
+    """
+    if orjson is not None:
+        data = orjson.dumps(result, option=orjson.OPT_INDENT_2)
+    else:
+        data = json.dumps(result, indent=2).encode("utf-8")
+
+    # Write then rename so a concurrent reader never sees a partial file
+    # Only readable by the current user, like the content file, as the
+    # response holds the path and metadata of the PDF
+    metadata_file_path = os.path.join(cache_dir, CACHE_METADATA_FILE)
+    fd = os.open(
+        metadata_file_path + ".tmp",
+        os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0),
+        0o600,
+    )
+    try:
+        _write_all(fd, data)
+    finally:
+        os.close(fd)
+    os.replace(metadata_file_path + ".tmp", metadata_file_path)
+
+
+def _password_error(error, file_size):
+    """
+    Build the error response for a PDF that needs a (correct) password
+
+    Args:
+        error: Error message to return
+        file_size: Size of the PDF file in bytes
+    """
+    return {
+        "success": False,
+        "error": error,
+        "is_encrypted": True,
+        "password_required": True,
+        "file_size": file_size,
+    }
+
+
+# Session IDs only need to be unique among the files in TEMP_DIR, a per-process
+# counter is enough for that once prefixed with something unique to the process.
+# The process ID alone isn't, a containerised server often gets the same one on
+# every start and would reuse the names of files a client may still be reading
+_session_prefix = f"{os.getpid():x}{secrets.token_hex(2)}"
+_session_seq = itertools.count()
+
+
+def _write_all(fd, data):
+    """
+    Write all of data to a raw file descriptor, os.write may write less than asked
+
+    Args:
+        fd: File descriptor to write to
+        data: Bytes to write
+    """
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view) :]
+
+
+def _write_content(
+    file_path,
+    cache_dir,
+    file_size,
+    is_encrypted,
+    total_pages,
+    metadata,
+    page_texts,
+    timed_out_pages,
+):
+    """
+    Write extracted page text to a single temporary content file and build the success response
+
+    Args:
+        file_path: Path to the source PDF, used to name the content file
+        cache_dir: Cache directory to write the content file to
+        file_size: Size of the PDF file in bytes
+        is_encrypted: Whether the PDF is encrypted
+        total_pages: Number of pages in the PDF
+        metadata: Metadata extracted from the PDF
+        page_texts: Iterable of (page_number, text) tuples, page_number is 1-indexed
+        timed_out_pages: Pages that were skipped because they hit PAGE_TIMEOUT, filled in while page_texts is consumed
+    """
+    # Generate a unique ID for this extraction session
+    session_id = f"{_session_prefix}-{next(_session_seq):x}"
+    pdf_name = os.path.splitext(os.path.basename(file_path))[0]
+
+    # Create a single content file, in a cache directory other users can't list
+    os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+    content_file_path = os.path.join(cache_dir, f"{pdf_name}_{session_id}_content.txt")
+
+    # Extract content from requested pages and write to a single file, it is
+    # only moved into place once complete so the cache never serves a partial file.
+    # Pages are encoded straight to bytes and written in batches on a raw file
+    # descriptor, skipping the text layer of a regular file object
+    content_file_size = 0
+    temp_file_path = content_file_path + ".tmp"
+    try:
+        # O_BINARY keeps Windows from translating newlines, which would make
+        # content_file_size wrong, and only exists there
+        fd = os.open(
+            temp_file_path,
+            os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0),
+            0o600,
+        )
+        try:
+            batch = []
+            batch_size = 0
+            for page_number, text in page_texts:
+                # Page header and content, some extractors emit lone surrogates
+                # that can't be encoded so replace those
+                page = f"--- PAGE {page_number} ---\n{text}\n\n".encode("utf-8", "replace")
+                batch.append(page)
+                batch_size += len(page)
+                if batch_size >= WRITE_BATCH_SIZE:
+                    _write_all(fd, b"".join(batch))
+                    content_file_size += batch_size
+                    batch = []
+                    batch_size = 0
+            _write_all(fd, b"".join(batch))
+            content_file_size += batch_size
+        finally:
+            os.close(fd)
+    except Exception:
+        # Don't leave a partial content file or an empty cache entry behind
+        # for cleanup to find later, without hiding the original error
+        with contextlib.suppress(OSError):
+            os.unlink(temp_file_path)
+        with contextlib.suppress(OSError):
+            os.rmdir(cache_dir)
+        raise
+
+    if timed_out_pages:
+        # A partial extraction is never cached, so keep its content file with
+        # the other loose files in TEMP_DIR that cleanup ages out, rather than
+        # in a cache entry that will never be completed
+        content_file_path = os.path.join(TEMP_DIR, os.path.basename(content_file_path))
+        os.replace(temp_file_path, content_file_path)
+        with contextlib.suppress(OSError):
+            os.rmdir(cache_dir)
+    else:
+        os.replace(temp_file_path, content_file_path)
+
+    result = {
+        "success": True,
+        "is_encrypted": is_encrypted,
+        "total_pages": total_pages,
+        "metadata": metadata,
+        "content_file": content_file_path,
+        "session_id": session_id,
+        "temp_dir": TEMP_DIR,
+        "file_size": file_size,
+        "content_file_size": content_file_size,
+    }
+    if timed_out_pages:
+        result["timed_out_pages"] = timed_out_pages
+        if len(timed_out_pages) == 1:
+            result["warning"] = (
+                f"Page {timed_out_pages[0]} took too long to extract and was left empty"
+            )
+        else:
+            result["warning"] = (
+                f"Pages {', '.join(map(str, timed_out_pages))} took too long to extract and were left empty"
+            )
+    return result
+
+
+def _extract(file_path, password, pages, backend, use_workers, stat):
+    """
+    Extract text from the PDF into a content file, or reuse a previous extraction
+
+    Args:
+        file_path: Absolute path to the PDF file
+        password: Optional password to decrypt the PDF
+        pages: Optional list of page numbers to extract (1-indexed)
+        backend: Text extraction backend to use
+        use_workers: Extract in worker processes instead of in-process
+        stat: os.stat result for the PDF file
+    """
+    file_size = stat.st_size
+
+    # Reuse a previous extraction of the same, unchanged file without opening
+    # it. The key includes the password, so a missing or wrong one never hits
+    cache_dir = _cache_dir(file_path, stat, password, pages, backend)
+    result = _load_cached(cache_dir)
+    if result is not None:
+        logger.info("Using cached extract for %s", file_path)
+        return result
+
+    with _cached_document(file_path, stat, password, backend) as (
+        doc,
+        is_encrypted,
+        needs_password,
+        decrypted,
+    ):
+        # Check the PDF could be decrypted if necessary
+        if needs_password:
+            if password is None:
+                return _password_error(
+                    "This PDF is password-protected. Please provide a password.",
+                    file_size,
+                )
+            if not decrypted:
+                return _password_error(
+                    "Incorrect password or PDF could not be decrypted", file_size
+                )
+
+        total_pages = doc.page_count if backend == "pymupdf" else len(doc.pages)
+
+        # Convert to 0-indexed for internal use, dropping invalid and repeated
+        # pages so no page is extracted twice. Reading every page is by far the
+        # most common call and needs no list of page numbers building
+        if pages:
+            zero_indexed_pages = sorted({p - 1 for p in pages if 1 <= p <= total_pages})
+        if not pages or len(zero_indexed_pages) == total_pages:
+            zero_indexed_pages = range(total_pages)
+
+        # Extract metadata
+        if backend == "pymupdf":
+            # Skip the fields the PDF doesn't set
+            metadata = {
+                PYMUPDF_METADATA_KEYS[key]: value
+                for key, value in (doc.metadata or {}).items()
+                if key in PYMUPDF_METADATA_KEYS and value
+            }
+        else:
+            # Values are coerced to plain strings so they serialise to JSON the
+            # same way whichever PyPDF2 object type they are. items() doesn't
+            # resolve indirect references, so look the value up through them
+            metadata = {
+                key.removeprefix("/") if isinstance(key, str) else key: str(value.get_object())
+                for key, value in (doc.metadata or {}).items()
+            }
+
+        timed_out_pages = []
+        result = _write_content(
+            file_path,
+            cache_dir,
+            file_size,
+            is_encrypted,
+            total_pages,
+            metadata,
+            _extract_pages(
+                doc,
+                file_path,
+                password,
+                backend,
+                use_workers,
+                zero_indexed_pages,
+                timed_out_pages,
+            ),
+            timed_out_pages,
+        )
+
+    # Don't cache a partial extraction, the slow pages may succeed next time
+    if not timed_out_pages:
+        _store_cached(cache_dir, result)
+    return result
+
+
 def read_pdf(
-    file_path: str, password: str = None, pages: Optional[List[int]] = None
+    file_path: str,
+    password: str = None,
+    pages: Optional[List[int]] = None,
+    backend: str = DEFAULT_BACKEND,
+    use_workers: bool = True,
 ) -> Dict[str, Any]:
     """
     Use this anytime you need to read a PDF file and extract its text.
@@ -73,6 +674,14 @@ def read_pdf(
         file_path: Path to the PDF file, this MUST be an absolute path on the filesystem.
         password: Optional password to decrypt the PDF if it's protected
         pages: Optional list of specific page numbers to extract (1-indexed). If None, all pages are extracted.
+            Each page is extracted once, in page order.
+        backend: Optional text extraction backend, "pymupdf" (much faster) or "pypdf2". Defaults to
+            "pymupdf" when PyMuPDF is installed and to "pypdf2" otherwise, asking for "pymupdf" without it
+            falls back to "pypdf2".
+        use_workers: Optional, defaults to True. Extract pages in separate worker processes, splitting long
+            PDFs across CPU cores. A page that takes too long to extract is left empty and listed in
+            timed_out_pages instead of hanging. Set to False to extract in-process, which skips starting
+            the workers but has no timeout, a page that hangs the parser hangs the server.
 
     Returns:
         json containing path to extracted text content file and metadata
@@ -86,94 +695,26 @@ def read_pdf(
     if not os.path.exists(file_path):
         return {"success": False, "error": f"File not found: {file_path}"}
 
+    if backend not in BACKENDS:
+        return {
+            "success": False,
+            "error": f"Unknown backend: {backend}. Use one of: {', '.join(BACKENDS)}",
+        }
+
+    # Only reached when "pymupdf" was asked for, it isn't the default without PyMuPDF
+    if backend == "pymupdf" and pymupdf is None:
+        logger.warning("PyMuPDF is not installed, falling back to PyPDF2")
+        backend = "pypdf2"
+
     try:
         # Get the file size
-        file_size = os.path.getsize(file_path)
-
-        with open(file_path, "rb") as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-
-            # Check if PDF is encrypted
-            is_encrypted = pdf_reader.is_encrypted
-
-            # Try to decrypt if necessary
-            decrypt_success = True
-            if is_encrypted:
-                if password is None:
-                    return {
-                        "success": False,
-                        "error": "This PDF is password-protected. Please provide a password.",
-                        "is_encrypted": True,
-                        "password_required": True,
-                        "file_size": file_size,
-                    }
-                decrypt_success = pdf_reader.decrypt(password)
-
-            # Return error if decryption failed
-            if is_encrypted and not decrypt_success:
-                return {
-                    "success": False,
-                    "error": "Incorrect password or PDF could not be decrypted",
-                    "is_encrypted": True,
-                    "password_required": True,
-                    "file_size": file_size,
-                }
-
-            # Extract metadata
-            metadata = {}
-            if pdf_reader.metadata:
-                for key, value in pdf_reader.metadata.items():
-                    if key.startswith("/"):
-                        metadata[key[1:]] = value
-                    else:
-                        metadata[key] = value
-
-            # Determine which pages to extract
-            total_pages = len(pdf_reader.pages)
-            pages_to_extract = pages or list(range(1, total_pages + 1))
-
-            # Convert to 0-indexed for internal use
-            zero_indexed_pages = [
-                p - 1 for p in pages_to_extract if 1 <= p <= total_pages
-            ]
-
-            # Generate a unique ID for this extraction session
-            session_id = str(uuid.uuid4())[:8]
-            pdf_name = os.path.splitext(os.path.basename(file_path))[0]
-
-            # Create a single content file
-            content_file_path = os.path.join(
-                TEMP_DIR, f"{pdf_name}_{session_id}_content.txt"
-            )
+        stat = os.stat(file_path)
+        file_size = stat.st_size
 
-            # Extract content from requested pages and write to a single file
-            with open(content_file_path, "w", encoding="utf-8") as content_file:
-                for page_number in zero_indexed_pages:
-                    page = pdf_reader.pages[page_number]
-                    text = page.extract_text()
-
-                    # Write page header and content
-                    content_file.write(f"--- PAGE {page_number + 1} ---\n")
-                    content_file.write(text)
-                    content_file.write("\n\n")
-
-            # Get the content file size
-            content_file_size = os.path.getsize(content_file_path)
-
-            return {
-                "success": True,
-                "is_encrypted": is_encrypted,
-                "total_pages": total_pages,
-                "metadata": metadata,
-                "content_file": content_file_path,
-                "session_id": session_id,
-                "temp_dir": TEMP_DIR,
-                "file_size": file_size,
-                "content_file_size": content_file_size,
-            }
+        return _extract(file_path, password, pages, backend, use_workers, stat)
 
     except Exception as e:
-        logger.error(f"Error processing PDF: {str(e)}")
+        logger.error("Error processing PDF: %s", e)
         return {
             "success": False,
             "error": f"Error processing PDF: {str(e)}",
@@ -181,6 +722,10 @@ def read_pdf(
         }
 
 
+if mcp is not None:
+    mcp.tool()(read_pdf)
+
+
 def test_pdf_reader(pdf_path="visa-rules-public.pdf"):
     """
     Test the PDF reader functionality with a specific PDF file.
@@ -188,20 +733,20 @@ def test_pdf_reader(pdf_path="visa-rules-public.pdf"):
     Args:
         pdf_path: Path to the PDF file to test
     """
-    logger.info(f"Testing PDF reader with {pdf_path}")
+    logger.info("Testing PDF reader with %s", pdf_path)
 
     # Test if file exists
     if not os.path.exists(pdf_path):
-        logger.error(f"File not found: {pdf_path}")
+        logger.error("File not found: %s", pdf_path)
         return False
 
     # Test reading the PDF
-    logger.info(f"Reading PDF file: {pdf_path}")
+    logger.info("Reading PDF file: %s", pdf_path)
     result = read_pdf(pdf_path)
 
     # Print results
     if result["success"]:
-        logger.info(f"Successfully read PDF with {result['total_pages']} pages")
+        logger.info("Successfully read PDF with %d pages", result["total_pages"])
 
         # Print metadata in a more readable format
         print("\n=== PDF Metadata ===")
@@ -229,10 +774,69 @@ def test_pdf_reader(pdf_path="visa-rules-public.pdf"):
         print(f"Is encrypted: {result['is_encrypted']}")
         return True
     else:
-        logger.error(f"Failed to read PDF: {result['error']}")
+        logger.error("Failed to read PDF: %s", result["error"])
         return False
 
 
+def test_stdio_server(pdf_path="dummy.pdf", timeout=60):
+    """
+    Test the PDF reader through a server subprocess over stdio, the way MCP
+    clients run it. Worker processes have deadlocked there while working fine
+    when read_pdf was called directly.
+
+    Args:
+        pdf_path: Path to the PDF file to test
+        timeout: Seconds each tool call may take before the test fails
+    """
+    import sys
+    import anyio
+    from mcp import ClientSession, StdioServerParameters
+    from mcp.client.stdio import stdio_client
+
+    logger.info("Testing PDF reader over stdio with %s", pdf_path)
+    server = StdioServerParameters(
+        command=sys.executable, args=[os.path.abspath(__file__)]
+    )
+
+    async def call_read_pdf(copy_dir):
+        async with stdio_client(server) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                # Both in-process extraction and worker processes, each on a
+                # fresh copy of the PDF so neither is served from the cache
+                for use_workers in (False, True):
+                    copy_path = shutil.copy(
+                        pdf_path, os.path.join(copy_dir, f"workers_{use_workers}.pdf")
+                    )
+                    with anyio.move_on_after(timeout) as scope:
+                        response = await session.call_tool(
+                            "read_pdf",
+                            {"file_path": copy_path, "use_workers": use_workers},
+                        )
+                    if scope.cancelled_caught:
+                        logger.error(
+                            "Reading PDF over stdio (use_workers=%s) took longer than %ss",
+                            use_workers,
+                            timeout,
+                        )
+                        return False
+                    result = json.loads(response.content[0].text)
+                    if not result["success"] or result.get("timed_out_pages"):
+                        logger.error(
+                            "Failed to read PDF over stdio (use_workers=%s): %s",
+                            use_workers,
+                            result.get("error") or result.get("warning"),
+                        )
+                        return False
+        return True
+
+    with tempfile.TemporaryDirectory() as copy_dir:
+        passed = anyio.run(call_read_pdf, copy_dir)
+    if passed:
+        logger.info("Successfully read PDF over stdio")
+    return passed
+
+
 def main():
     """Entry point for the package when installed via pip."""
     import sys
@@ -249,9 +853,17 @@ def main():
         import json
 
         print(json.dumps(result, indent=2))
+
+        # Finally run the server as a subprocess and read the PDF over stdio
+        if not test_stdio_server(pdf_path):
+            sys.exit(1)
     else:
         # Normal MCP server mode
         logger.info("Starting MCP server...")
+        # Clean up old files in the background so the server starts straight
+        # away, and keep doing so for as long as it runs. Started here rather
+        # than on import so importing the module has no background threads
+        threading.Thread(target=_schedule_cleanup, daemon=True).start()
         mcp.run()
 
 if __name__ == "__main__":
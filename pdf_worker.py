@@ -0,0 +1,133 @@
+"""
+Opening PDFs and extracting page text, shared by the server and its worker processes.
+
+Worker processes are spawned and import this module by name, so it must not
+have any side effects on import - no logging setup, no MCP server, no threads.
+"""
+import contextlib
+import mmap
+
+import PyPDF2
+
+try:
+    import pymupdf
+except ImportError:
+    pymupdf = None
+
+
+def page_text(doc, backend, page_number):
+    """
+    Extract the text of a single page
+
+    Args:
+        doc: Open PyMuPDF document or PyPDF2 reader
+        backend: Backend that opened the document
+        page_number: Page number to extract (0-indexed)
+    """
+    if backend == "pymupdf":
+        return doc[page_number].get_text("text")
+    return doc.pages[page_number].extract_text()
+
+
+def _map_file(file):
+    """
+    Memory map an open PDF so PyPDF2 reads it straight from the page cache
+    instead of through many small buffered reads
+
+    Args:
+        file: PDF file opened in binary mode
+
+    Returns:
+        The read-only mapping, or the file itself if it can't be mapped
+    """
+    try:
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, OverflowError, OSError):
+        # Empty files can't be mapped, nor can files larger than the address space
+        return file
+
+
+def open_document(file_path, backend, stack):
+    """
+    Open a PDF with the given backend
+
+    Args:
+        file_path: Absolute path to the PDF file
+        backend: Text extraction backend to use
+        stack: ExitStack that closes the document, and the file mapping for PyPDF2
+
+    Returns:
+        Tuple of (doc, is_encrypted, needs_password). A PDF encrypted with an
+        empty user password is encrypted but opens without one
+    """
+    if backend == "pymupdf":
+        # MuPDF opens other document formats too, only accept PDFs
+        doc = stack.enter_context(pymupdf.open(file_path, filetype="pdf"))
+        needs_password = bool(doc.needs_pass)
+        # Metadata isn't readable until a password protected PDF is decrypted
+        is_encrypted = needs_password or bool(doc.metadata.get("encryption"))
+        return doc, is_encrypted, needs_password
+
+    # A file that couldn't be mapped is returned as is, closing it twice is harmless
+    file = stack.enter_context(open(file_path, "rb"))
+    doc = PyPDF2.PdfReader(stack.enter_context(_map_file(file)))
+    # PdfReader already tries the empty user password, see if that worked
+    needs_password = doc.is_encrypted and not doc.decrypt("")
+    return doc, doc.is_encrypted, needs_password
+
+
+def decrypt(doc, backend, password):
+    """
+    Decrypt a password-protected PDF
+
+    Args:
+        doc: Open PyMuPDF document or PyPDF2 reader
+        backend: Backend that opened the document
+        password: Password to decrypt the PDF with
+
+    Returns:
+        True if the password was correct
+    """
+    if backend == "pymupdf":
+        return bool(doc.authenticate(password))
+    return bool(doc.decrypt(password))
+
+
+# Document opened by init_worker, one per worker process
+_worker_doc = None
+_worker_backend = None
+
+
+def init_worker(file_path, password, backend, ready):
+    """
+    Open the PDF once in each worker process of the extraction pool
+
+    Args:
+        file_path: Absolute path to the PDF file
+        password: Optional password to decrypt the PDF
+        backend: Text extraction backend to use
+        ready: Semaphore released once the PDF is open, so the server only starts timing pages then
+    """
+    global _worker_doc, _worker_backend
+    _worker_backend = backend
+    # The document is never closed, it has to stay open for as long as the
+    # worker runs and is released when the worker process exits
+    _worker_doc, _, needs_password = open_document(
+        file_path, backend, contextlib.ExitStack()
+    )
+    if needs_password:
+        decrypt(_worker_doc, backend, password)
+    ready.release()
+
+
+def extract_one(page_number):
+    """
+    Extract a single page in a worker process
+
+    Args:
+        page_number: Page number to extract (0-indexed)
+
+    Returns:
+        Tuple of (page_number, text)
+    """
+    return page_number, page_text(_worker_doc, _worker_backend, page_number)